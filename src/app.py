@@ -5,10 +5,14 @@ A super simple FastAPI application that allows students to view and sign up
 for extracurricular activities at Mergington High School.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
+from pydantic import BaseModel
+import itertools
+import json
 import os
+import uuid
 from pathlib import Path
 
 app = FastAPI(title="Mergington High School API",
@@ -25,67 +29,117 @@ activities = {
         "description": "Develop argumentation and public speaking skills",
         "schedule": "Wednesdays, 4:00 PM - 5:30 PM",
         "max_participants": 16,
-        "participants": ["alex@mergington.edu"]
+        "participants": {"alex@mergington.edu"}
         },
         "Science Club": {
         "description": "Explore scientific experiments and discoveries",
         "schedule": "Thursdays, 3:30 PM - 4:45 PM",
         "max_participants": 18,
-        "participants": ["james@mergington.edu", "lucy@mergington.edu"]
+        "participants": {"james@mergington.edu", "lucy@mergington.edu"}
         },
         "Basketball Team": {
         "description": "Competitive basketball training and games",
         "schedule": "Mondays and Wednesdays, 4:00 PM - 5:30 PM",
         "max_participants": 15,
-        "participants": ["marcus@mergington.edu"]
+        "participants": {"marcus@mergington.edu"}
         },
         "Tennis Club": {
         "description": "Tennis skills development and matches",
         "schedule": "Tuesdays and Thursdays, 4:00 PM - 5:15 PM",
         "max_participants": 12,
-        "participants": ["sarah@mergington.edu", "ryan@mergington.edu"]
+        "participants": {"sarah@mergington.edu", "ryan@mergington.edu"}
         },
         "Drama Club": {
         "description": "Theater performances and acting workshops",
         "schedule": "Mondays and Thursdays, 3:30 PM - 5:00 PM",
         "max_participants": 25,
-        "participants": ["isabella@mergington.edu"]
+        "participants": {"isabella@mergington.edu"}
         },
         "Art Studio": {
         "description": "Painting, drawing, and sculpture techniques",
         "schedule": "Tuesdays and Fridays, 3:30 PM - 5:00 PM",
         "max_participants": 20,
-        "participants": ["hannah@mergington.edu", "grace@mergington.edu"]
+        "participants": {"hannah@mergington.edu", "grace@mergington.edu"}
         },
     "Chess Club": {
         "description": "Learn strategies and compete in chess tournaments",
         "schedule": "Fridays, 3:30 PM - 5:00 PM",
         "max_participants": 12,
-        "participants": ["michael@mergington.edu", "daniel@mergington.edu"]
+        "participants": {"michael@mergington.edu", "daniel@mergington.edu"}
     },
     "Programming Class": {
         "description": "Learn programming fundamentals and build software projects",
         "schedule": "Tuesdays and Thursdays, 3:30 PM - 4:30 PM",
         "max_participants": 20,
-        "participants": ["emma@mergington.edu", "sophia@mergington.edu"]
+        "participants": {"emma@mergington.edu", "sophia@mergington.edu"}
     },
     "Gym Class": {
         "description": "Physical education and sports activities",
         "schedule": "Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM",
         "max_participants": 30,
-        "participants": ["john@mergington.edu", "olivia@mergington.edu"]
+        "participants": {"john@mergington.edu", "olivia@mergington.edu"}
     }
 }
 
 
+class EmailBatch(BaseModel):
+    """Request body for batch signup/unregister"""
+    emails: list[str]
+
+
+# Serialized GET /activities body, rebuilt only after the activities change.
+# ETags combine a per-process token with a version number, so ETags handed out
+# before a restart never match the new process's state.
+_etag_token = uuid.uuid4().hex
+_versions = itertools.count(1)
+_version = 0
+_cached_json = None  # (version, body) pair
+
+
+def invalidate_activities_cache():
+    """Mark the cached activities response as stale; call after changing activities"""
+    global _version
+    # next() on itertools.count is atomic, so concurrent mutations never share a version
+    _version = next(_versions)
+
+
+def _serialize_activities():
+    """Encode the activities as JSON, with participants sets as sorted lists"""
+    return json.dumps({
+        name: {**details, "participants": sorted(details["participants"])}
+        for name, details in activities.items()
+    }).encode()
+
+
 @app.get("/")
 def root():
     return RedirectResponse(url="/static/index.html")
 
 
 @app.get("/activities")
-def get_activities():
-    return activities
+def get_activities(request: Request):
+    global _cached_json
+    # Snapshot the version once so the ETag and body describe the same state
+    version = _version
+    etag = f'W/"{_etag_token}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    # Client already has the current version; If-None-Match uses weak comparison,
+    # so a tag matches with or without its W/ prefix
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in tags or etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers=headers)
+
+    cached = _cached_json
+    if cached is not None and cached[0] == version:
+        body = cached[1]
+    else:
+        body = _serialize_activities()
+        # Skip caching if the activities changed while serializing
+        if _version == version:
+            _cached_json = (version, body)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.post("/activities/{activity_name}/signup")
@@ -103,7 +157,8 @@ def signup_for_activity(activity_name: str, email: str):
         raise HTTPException(status_code=400, detail="Student already signed up")
 
     # Add student
-    activity["participants"].append(email)
+    activity["participants"].add(email)
+    invalidate_activities_cache()
     return {"message": f"Signed up {email} for {activity_name}"}
 
 
@@ -122,5 +177,56 @@ def unregister_from_activity(activity_name: str, email: str):
         raise HTTPException(status_code=400, detail="Student not registered for this activity")
 
     # Remove student
-    activity["participants"].remove(email)
+    activity["participants"].discard(email)
+    invalidate_activities_cache()
     return {"message": f"Unregistered {email} from {activity_name}"}
+
+
+@app.post("/activities/{activity_name}/signup:batch")
+def batch_signup_for_activity(activity_name: str, batch: EmailBatch):
+    """Sign up several students for an activity in one request"""
+    # Validate activity exists
+    if activity_name not in activities:
+        raise HTTPException(status_code=404, detail="Activity not found")
+
+    participants = activities[activity_name]["participants"]
+
+    # Report a status per email so one duplicate doesn't fail the whole batch
+    results = []
+    changed = False
+    # Drop repeats within the batch, keeping the first occurrence
+    for email in dict.fromkeys(batch.emails):
+        if email in participants:
+            results.append({"email": email, "status": "already signed up"})
+        else:
+            participants.add(email)
+            results.append({"email": email, "status": "signed up"})
+            changed = True
+    if changed:
+        invalidate_activities_cache()
+    return {"results": results}
+
+
+@app.post("/activities/{activity_name}/unregister:batch")
+def batch_unregister_from_activity(activity_name: str, batch: EmailBatch):
+    """Unregister several students from an activity in one request"""
+    # Validate activity exists
+    if activity_name not in activities:
+        raise HTTPException(status_code=404, detail="Activity not found")
+
+    participants = activities[activity_name]["participants"]
+
+    # Report a status per email so one unknown student doesn't fail the whole batch
+    results = []
+    changed = False
+    # Drop repeats within the batch, keeping the first occurrence
+    for email in dict.fromkeys(batch.emails):
+        if email not in participants:
+            results.append({"email": email, "status": "not registered"})
+        else:
+            participants.discard(email)
+            results.append({"email": email, "status": "unregistered"})
+            changed = True
+    if changed:
+        invalidate_activities_cache()
+    return {"results": results}
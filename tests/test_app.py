@@ -2,95 +2,174 @@
 Tests for the Mergington High School Activities API
 """
 
+import asyncio
+
+import httpx
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
-from src.app import app, activities
+import src.app as src_app
+from src.app import app, activities, invalidate_activities_cache
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def client():
-    """Create a test client for the FastAPI app"""
+    """Create a test client for the FastAPI app, shared across the session"""
+    # The app has no startup/shutdown handlers, so skip entering the lifespan context
     return TestClient(app)
 
 
-@pytest.fixture(autouse=True)
-def reset_activities():
-    """Reset activities to initial state before each test"""
-    initial_activities = {
-        "Debate Team": {
-            "description": "Develop argumentation and public speaking skills",
-            "schedule": "Wednesdays, 4:00 PM - 5:30 PM",
-            "max_participants": 16,
-            "participants": ["alex@mergington.edu"]
-        },
-        "Science Club": {
-            "description": "Explore scientific experiments and discoveries",
-            "schedule": "Thursdays, 3:30 PM - 4:45 PM",
-            "max_participants": 18,
-            "participants": ["james@mergington.edu", "lucy@mergington.edu"]
-        },
-        "Basketball Team": {
-            "description": "Competitive basketball training and games",
-            "schedule": "Mondays and Wednesdays, 4:00 PM - 5:30 PM",
-            "max_participants": 15,
-            "participants": ["marcus@mergington.edu"]
-        },
-        "Tennis Club": {
-            "description": "Tennis skills development and matches",
-            "schedule": "Tuesdays and Thursdays, 4:00 PM - 5:15 PM",
-            "max_participants": 12,
-            "participants": ["sarah@mergington.edu", "ryan@mergington.edu"]
-        },
-        "Drama Club": {
-            "description": "Theater performances and acting workshops",
-            "schedule": "Mondays and Thursdays, 3:30 PM - 5:00 PM",
-            "max_participants": 25,
-            "participants": ["isabella@mergington.edu"]
-        },
-        "Art Studio": {
-            "description": "Painting, drawing, and sculpture techniques",
-            "schedule": "Tuesdays and Fridays, 3:30 PM - 5:00 PM",
-            "max_participants": 20,
-            "participants": ["hannah@mergington.edu", "grace@mergington.edu"]
-        },
-        "Chess Club": {
-            "description": "Learn strategies and compete in chess tournaments",
-            "schedule": "Fridays, 3:30 PM - 5:00 PM",
-            "max_participants": 12,
-            "participants": ["michael@mergington.edu", "daniel@mergington.edu"]
-        },
-        "Programming Class": {
-            "description": "Learn programming fundamentals and build software projects",
-            "schedule": "Tuesdays and Thursdays, 3:30 PM - 4:30 PM",
-            "max_participants": 20,
-            "participants": ["emma@mergington.edu", "sophia@mergington.edu"]
-        },
-        "Gym Class": {
-            "description": "Physical education and sports activities",
-            "schedule": "Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM",
-            "max_participants": 30,
-            "participants": ["john@mergington.edu", "olivia@mergington.edu"]
+@pytest_asyncio.fixture
+async def async_client():
+    """Create an async client that calls the FastAPI app in-process"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+# Initial activities state, built once at import time and never mutated:
+# (name, description, schedule, max_participants, participants)
+_TEMPLATE: tuple[tuple[str, str, str, int, tuple[str, ...]], ...] = (
+    (
+        "Debate Team",
+        "Develop argumentation and public speaking skills",
+        "Wednesdays, 4:00 PM - 5:30 PM",
+        16,
+        ("alex@mergington.edu",),
+    ),
+    (
+        "Science Club",
+        "Explore scientific experiments and discoveries",
+        "Thursdays, 3:30 PM - 4:45 PM",
+        18,
+        ("james@mergington.edu", "lucy@mergington.edu"),
+    ),
+    (
+        "Basketball Team",
+        "Competitive basketball training and games",
+        "Mondays and Wednesdays, 4:00 PM - 5:30 PM",
+        15,
+        ("marcus@mergington.edu",),
+    ),
+    (
+        "Tennis Club",
+        "Tennis skills development and matches",
+        "Tuesdays and Thursdays, 4:00 PM - 5:15 PM",
+        12,
+        ("sarah@mergington.edu", "ryan@mergington.edu"),
+    ),
+    (
+        "Drama Club",
+        "Theater performances and acting workshops",
+        "Mondays and Thursdays, 3:30 PM - 5:00 PM",
+        25,
+        ("isabella@mergington.edu",),
+    ),
+    (
+        "Art Studio",
+        "Painting, drawing, and sculpture techniques",
+        "Tuesdays and Fridays, 3:30 PM - 5:00 PM",
+        20,
+        ("hannah@mergington.edu", "grace@mergington.edu"),
+    ),
+    (
+        "Chess Club",
+        "Learn strategies and compete in chess tournaments",
+        "Fridays, 3:30 PM - 5:00 PM",
+        12,
+        ("michael@mergington.edu", "daniel@mergington.edu"),
+    ),
+    (
+        "Programming Class",
+        "Learn programming fundamentals and build software projects",
+        "Tuesdays and Thursdays, 3:30 PM - 4:30 PM",
+        20,
+        ("emma@mergington.edu", "sophia@mergington.edu"),
+    ),
+    (
+        "Gym Class",
+        "Physical education and sports activities",
+        "Mondays, Wednesdays, Fridays, 2:00 PM - 3:00 PM",
+        30,
+        ("john@mergington.edu", "olivia@mergington.edu"),
+    ),
+)
+
+
+# One (activity, already registered student) pair per activity, for parametrized tests
+_REGISTERED = [(name, participants[0]) for name, _, _, _, participants in _TEMPLATE]
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    """Initial activities as GET /activities serializes them, for read-only tests"""
+    return {
+        name: {
+            "description": description,
+            "schedule": schedule,
+            "max_participants": max_participants,
+            "participants": sorted(participants),
         }
+        for name, description, schedule, max_participants, participants in _TEMPLATE
     }
-    
+
+
+def _restore_activities():
+    """Replace the app's activities with a fresh copy of the template"""
     activities.clear()
-    activities.update(initial_activities)
+    # The strings are shared with the template; only the participants sets are new
+    activities.update({
+        name: {
+            "description": description,
+            "schedule": schedule,
+            "max_participants": max_participants,
+            "participants": set(participants),
+        }
+        for name, description, schedule, max_participants, participants in _TEMPLATE
+    })
+    invalidate_activities_cache()
+
+
+@pytest.fixture
+def reset_activities():
+    """Reset activities to initial state before a test that mutates them"""
+    # No teardown: the next mutating test resets on setup anyway
+    _restore_activities()
+
+
+@pytest.fixture(scope="class")
+def reset_activities_once():
+    """Reset activities once for a class of read-only tests"""
+    # Mutating tests may already have run on this worker, so don't assume initial state
+    _restore_activities()
+
+
+@pytest.fixture
+def activity(request, reset_activities):
+    """Activity name passed indirectly by parametrize, with activities freshly reset"""
+    return request.param
+
+
+@pytest.fixture(scope="module", autouse=True)
+def clean_slate():
+    """Restore activities once after the module's tests have run"""
     yield
-    activities.clear()
-    activities.update(initial_activities)
+    _restore_activities()
 
 
+@pytest.mark.xdist_group("readonly")
+@pytest.mark.usefixtures("reset_activities_once")
 class TestGetActivities:
     """Tests for GET /activities endpoint"""
     
-    def test_get_activities_returns_all_activities(self, client):
+    def test_get_activities_returns_all_activities(self, client, baseline):
         """Test that GET /activities returns all activities"""
         response = client.get("/activities")
         assert response.status_code == 200
         data = response.json()
         assert "Debate Team" in data
         assert "Science Club" in data
-        assert len(data) == 9
+        assert data == baseline
     
     def test_activities_have_required_fields(self, client):
         """Test that activities have all required fields"""
@@ -110,111 +189,268 @@ class TestGetActivities:
         
         for activity_name, activity in data.items():
             assert isinstance(activity["participants"], list)
+    
+    def test_unchanged_activities_return_not_modified(self, client):
+        """Test that a matching If-None-Match header gets a 304 response"""
+        response = client.get("/activities")
+        etag = response.headers["etag"]
+        
+        cached_response = client.get("/activities", headers={"If-None-Match": etag})
+        assert cached_response.status_code == 304
+        assert cached_response.headers["etag"] == etag
+    
+    @pytest.mark.parametrize("if_none_match", [
+        "{etag}",
+        "{strong}",
+        '"other", {etag}',
+        "*",
+    ])
+    def test_if_none_match_uses_weak_comparison(self, client, if_none_match):
+        """Test that If-None-Match matches strong forms, tag lists and the wildcard"""
+        etag = client.get("/activities").headers["etag"]
+        header = if_none_match.format(etag=etag, strong=etag.removeprefix("W/"))
+        
+        response = client.get("/activities", headers={"If-None-Match": header})
+        assert response.status_code == 304
+    
+    def test_other_etag_returns_activities(self, client):
+        """Test that a non-matching If-None-Match gets the full response"""
+        response = client.get("/activities", headers={"If-None-Match": 'W/"stale"'})
+        assert response.status_code == 200
+    
+    def test_etag_does_not_match_after_restart(self, client, monkeypatch):
+        """Test that an ETag from a previous server process is not honored"""
+        etag = client.get("/activities").headers["etag"]
+        
+        # A restarted process generates a new token
+        monkeypatch.setattr("src.app._etag_token", "restarted")
+        
+        response = client.get("/activities", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
 
 
+
+class TestActivitiesCache:
+    """Tests for the cached GET /activities response"""
+    
+    def test_change_during_serialization_is_not_cached(
+        self, client, reset_activities, monkeypatch
+    ):
+        """Test that a body serialized before a concurrent change isn't cached"""
+        real_serialize = src_app._serialize_activities
+        
+        def serialize_then_signup():
+            # Simulate a signup landing on another thread mid-request
+            body = real_serialize()
+            activities["Debate Team"]["participants"].add("racer@mergington.edu")
+            invalidate_activities_cache()
+            return body
+        
+        monkeypatch.setattr(src_app, "_serialize_activities", serialize_then_signup)
+        client.get("/activities")
+        monkeypatch.undo()
+        
+        response = client.get("/activities")
+        assert "racer@mergington.edu" in response.json()["Debate Team"]["participants"]
+
+@pytest.mark.usefixtures("reset_activities")
 class TestSignupForActivity:
     """Tests for POST /activities/{activity_name}/signup endpoint"""
     
     def test_successful_signup(self, client):
         """Test successful signup for an activity"""
         response = client.post(
-            "/activities/Debate Team/signup?email=newstudent@mergington.edu"
+            "/activities/Debate Team/signup",
+            params={"email": "newstudent@mergington.edu"}
         )
         assert response.status_code == 200
-        data = response.json()
-        assert "message" in data
         assert "newstudent@mergington.edu" in activities["Debate Team"]["participants"]
     
+    def test_signup_message_contract(self, client):
+        """Test that a successful signup returns a confirmation message"""
+        response = client.post(
+            "/activities/Debate Team/signup",
+            params={"email": "newstudent@mergington.edu"}
+        )
+        assert response.status_code == 200
+        assert response.json() == {
+            "message": "Signed up newstudent@mergington.edu for Debate Team"
+        }
+    
+    def test_signup_changes_activities_etag(self, client):
+        """Test that signing up invalidates the cached activities response"""
+        etag = client.get("/activities").headers["etag"]
+        
+        client.post(
+            "/activities/Debate Team/signup",
+            params={"email": "newstudent@mergington.edu"}
+        )
+        
+        response = client.get("/activities", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert "newstudent@mergington.edu" in response.json()["Debate Team"]["participants"]
+    
     def test_signup_nonexistent_activity(self, client):
         """Test signup for a non-existent activity"""
         response = client.post(
-            "/activities/Nonexistent Club/signup?email=student@mergington.edu"
+            "/activities/Nonexistent Club/signup",
+            params={"email": "student@mergington.edu"}
         )
         assert response.status_code == 404
-        data = response.json()
-        assert "detail" in data
-        assert "Activity not found" in data["detail"]
+        assert b"Activity not found" in response.content
     
-    def test_signup_already_registered(self, client):
+    @pytest.mark.parametrize("activity,email", _REGISTERED, indirect=["activity"])
+    def test_signup_already_registered(self, client, activity, email):
         """Test signup for an activity when already registered"""
         response = client.post(
-            "/activities/Debate Team/signup?email=alex@mergington.edu"
+            f"/activities/{activity}/signup",
+            params={"email": email}
         )
         assert response.status_code == 400
-        data = response.json()
-        assert "detail" in data
-        assert "already signed up" in data["detail"]
+        assert b"already signed up" in response.content
     
     def test_signup_multiple_students(self, client):
         """Test that multiple students can sign up"""
         initial_count = len(activities["Science Club"]["participants"])
         
-        response1 = client.post(
-            "/activities/Science Club/signup?email=student1@mergington.edu"
-        )
-        response2 = client.post(
-            "/activities/Science Club/signup?email=student2@mergington.edu"
+        response = client.post(
+            "/activities/Science Club/signup:batch",
+            json={"emails": ["student1@mergington.edu", "student2@mergington.edu"]}
         )
         
-        assert response1.status_code == 200
-        assert response2.status_code == 200
+        assert response.status_code == 200
         assert len(activities["Science Club"]["participants"]) == initial_count + 2
+    
+    def test_batch_signup_reports_per_email_status(self, client):
+        """Test that batch signup reports already registered students without failing"""
+        response = client.post(
+            "/activities/Debate Team/signup:batch",
+            json={"emails": ["alex@mergington.edu", "newstudent@mergington.edu"]}
+        )
+        assert response.status_code == 200
+        assert response.json()["results"] == [
+            {"email": "alex@mergington.edu", "status": "already signed up"},
+            {"email": "newstudent@mergington.edu", "status": "signed up"},
+        ]
+        assert "newstudent@mergington.edu" in activities["Debate Team"]["participants"]
+    
+    def test_batch_signup_ignores_repeated_emails(self, client):
+        """Test that an email repeated within one batch is reported only once"""
+        response = client.post(
+            "/activities/Debate Team/signup:batch",
+            json={"emails": [
+                "newstudent@mergington.edu",
+                "other@mergington.edu",
+                "newstudent@mergington.edu",
+            ]}
+        )
+        assert response.status_code == 200
+        assert response.json()["results"] == [
+            {"email": "newstudent@mergington.edu", "status": "signed up"},
+            {"email": "other@mergington.edu", "status": "signed up"},
+        ]
+    
+    def test_batch_signup_of_duplicates_keeps_etag(self, client):
+        """Test that a batch that changes nothing doesn't invalidate the cached response"""
+        etag = client.get("/activities").headers["etag"]
+        
+        client.post(
+            "/activities/Debate Team/signup:batch",
+            json={"emails": ["alex@mergington.edu"]}
+        )
+        
+        response = client.get("/activities", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+    
+    def test_batch_signup_nonexistent_activity(self, client):
+        """Test batch signup for a non-existent activity"""
+        response = client.post(
+            "/activities/Nonexistent Club/signup:batch",
+            json={"emails": ["student@mergington.edu"]}
+        )
+        assert response.status_code == 404
 
 
+@pytest.mark.usefixtures("reset_activities")
 class TestUnregisterFromActivity:
     """Tests for POST /activities/{activity_name}/unregister endpoint"""
     
-    def test_successful_unregister(self, client):
+    @pytest.mark.parametrize("activity,email", _REGISTERED, indirect=["activity"])
+    def test_successful_unregister(self, client, activity, email):
         """Test successful unregister from an activity"""
         # First verify the student is registered
-        assert "alex@mergington.edu" in activities["Debate Team"]["participants"]
+        assert email in activities[activity]["participants"]
         
         response = client.post(
-            "/activities/Debate Team/unregister?email=alex@mergington.edu"
+            f"/activities/{activity}/unregister",
+            params={"email": email}
         )
         assert response.status_code == 200
-        data = response.json()
-        assert "message" in data
-        assert "alex@mergington.edu" not in activities["Debate Team"]["participants"]
+        assert email not in activities[activity]["participants"]
     
     def test_unregister_nonexistent_activity(self, client):
         """Test unregister from a non-existent activity"""
         response = client.post(
-            "/activities/Nonexistent Club/unregister?email=student@mergington.edu"
+            "/activities/Nonexistent Club/unregister",
+            params={"email": "student@mergington.edu"}
         )
         assert response.status_code == 404
-        data = response.json()
-        assert "Activity not found" in data["detail"]
+        assert b"Activity not found" in response.content
     
     def test_unregister_not_registered_student(self, client):
         """Test unregister when student is not registered"""
         response = client.post(
-            "/activities/Debate Team/unregister?email=notregistered@mergington.edu"
+            "/activities/Debate Team/unregister",
+            params={"email": "notregistered@mergington.edu"}
         )
         assert response.status_code == 400
-        data = response.json()
-        assert "not registered" in data["detail"]
+        assert b"not registered" in response.content
     
     def test_unregister_multiple_students(self, client):
         """Test unregistering multiple students from the same activity"""
         initial_count = len(activities["Science Club"]["participants"])
         
-        response1 = client.post(
-            "/activities/Science Club/unregister?email=james@mergington.edu"
-        )
-        response2 = client.post(
-            "/activities/Science Club/unregister?email=lucy@mergington.edu"
+        response = client.post(
+            "/activities/Science Club/unregister:batch",
+            json={"emails": ["james@mergington.edu", "lucy@mergington.edu"]}
         )
         
-        assert response1.status_code == 200
-        assert response2.status_code == 200
+        assert response.status_code == 200
         assert len(activities["Science Club"]["participants"]) == initial_count - 2
+    
+    def test_batch_unregister_reports_per_email_status(self, client):
+        """Test that batch unregister reports unknown students without failing"""
+        response = client.post(
+            "/activities/Debate Team/unregister:batch",
+            json={"emails": ["alex@mergington.edu", "notregistered@mergington.edu"]}
+        )
+        assert response.status_code == 200
+        assert response.json()["results"] == [
+            {"email": "alex@mergington.edu", "status": "unregistered"},
+            {"email": "notregistered@mergington.edu", "status": "not registered"},
+        ]
+        assert "alex@mergington.edu" not in activities["Debate Team"]["participants"]
+    
+    def test_batch_unregister_ignores_repeated_emails(self, client):
+        """Test that an email repeated within one batch is reported only once"""
+        response = client.post(
+            "/activities/Debate Team/unregister:batch",
+            json={"emails": ["alex@mergington.edu", "alex@mergington.edu"]}
+        )
+        assert response.status_code == 200
+        assert response.json()["results"] == [
+            {"email": "alex@mergington.edu", "status": "unregistered"},
+        ]
 
 
+@pytest.mark.usefixtures("reset_activities")
 class TestIntegration:
     """Integration tests combining multiple endpoints"""
     
-    def test_signup_and_unregister_workflow(self, client):
+    @pytest.mark.asyncio
+    async def test_signup_and_unregister_workflow(self, async_client):
         """Test the complete workflow of signing up and unregistering"""
         email = "integration@mergington.edu"
         activity = "Chess Club"
@@ -223,20 +459,21 @@ class TestIntegration:
         initial_participants = activities[activity]["participants"].copy()
         
         # Sign up
-        signup_response = client.post(
-            f"/activities/{activity}/signup?email={email}"
+        signup_response = await async_client.post(
+            f"/activities/{activity}/signup",
+            params={"email": email}
         )
         assert signup_response.status_code == 200
         assert email in activities[activity]["participants"]
         
         # Verify activities endpoint shows the new participant
-        activities_response = client.get("/activities")
-        data = activities_response.json()
+        data = (await async_client.get("/activities")).json()
         assert email in data[activity]["participants"]
         
         # Unregister
-        unregister_response = client.post(
-            f"/activities/{activity}/unregister?email={email}"
+        unregister_response = await async_client.post(
+            f"/activities/{activity}/unregister",
+            params={"email": email}
         )
         assert unregister_response.status_code == 200
         assert email not in activities[activity]["participants"]
@@ -244,31 +481,39 @@ class TestIntegration:
         # Verify we're back to initial state
         assert activities[activity]["participants"] == initial_participants
     
-    def test_participant_count_accuracy(self, client):
+    @pytest.mark.asyncio
+    async def test_participant_count_accuracy(self, async_client):
         """Test that participant counts remain accurate"""
         activity = "Tennis Club"
-        
-        # Get initial count from activities endpoint
-        initial_response = client.get("/activities")
-        initial_data = initial_response.json()
-        initial_count = len(initial_data[activity]["participants"])
+        initial_count = len(activities[activity]["participants"])
         
         # Add a participant
-        client.post(
-            f"/activities/{activity}/signup?email=newplayer@mergington.edu"
+        signup_response = await async_client.post(
+            f"/activities/{activity}/signup",
+            params={"email": "newplayer@mergington.edu"}
         )
-        
-        # Verify count increased
-        after_signup = client.get("/activities")
-        after_data = after_signup.json()
-        assert len(after_data[activity]["participants"]) == initial_count + 1
+        assert signup_response.status_code == 200
+        assert len(activities[activity]["participants"]) == initial_count + 1
         
         # Remove a participant
-        client.post(
-            f"/activities/{activity}/unregister?email=newplayer@mergington.edu"
+        unregister_response = await async_client.post(
+            f"/activities/{activity}/unregister",
+            params={"email": "newplayer@mergington.edu"}
         )
+        assert unregister_response.status_code == 200
+        assert len(activities[activity]["participants"]) == initial_count
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_signups(self, async_client):
+        """Test that independent signups issued concurrently all succeed"""
+        activity = "Drama Club"
+        emails = [f"actor{i}@mergington.edu" for i in range(5)]
+        initial_count = len(activities[activity]["participants"])
+        
+        responses = await asyncio.gather(*(
+            async_client.post(f"/activities/{activity}/signup", params={"email": email})
+            for email in emails
+        ))
         
-        # Verify count is back to initial
-        after_unregister = client.get("/activities")
-        after_data = after_unregister.json()
-        assert len(after_data[activity]["participants"]) == initial_count
+        assert all(response.status_code == 200 for response in responses)
+        assert len(activities[activity]["participants"]) == initial_count + len(emails)